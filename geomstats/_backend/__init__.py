@@ -22,6 +22,7 @@ BACKEND_ATTRIBUTES = {
         'arccos',
         'arccosh',
         'arcsin',
+        'arcsinh',
         'arctan2',
         'arctanh',
         'argmax',
@@ -12,6 +12,7 @@ from autograd.numpy import (  # NOQA
     arccos,
     arccosh,
     arcsin,
+    arcsinh,
     arctan2,
     arctanh,
     argmax,
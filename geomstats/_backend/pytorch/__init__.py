@@ -272,7 +272,10 @@ def arccosh(x):
 
 
 def arcsinh(x):
-    return torch.log(x + torch.sqrt(x * x + 1))
+    # log1p form, accurate near 0 unlike log(x + sqrt(x * x + 1))
+    sq_x = x * x
+    return torch.sign(x) * torch.log1p(
+        torch.abs(x) + sq_x / (1 + torch.sqrt(1 + sq_x)))
 
 
 def arcosh(x):
@@ -9,6 +9,7 @@ from tensorflow import (  # NOQA
     argmax,
     argmin,
     asin as arcsin,
+    asinh as arcsinh,
     atan2 as arctan2,
     clip_by_value as clip,
     concat as concatenate,
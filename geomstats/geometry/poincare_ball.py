@@ -4,11 +4,86 @@ The n-dimensional hyperbolic space embedded with
 the hyperboloid representation (embedded in minkowsky space).
 """
 import geomstats.backend as gs
+import geomstats.vectorization
 from geomstats.geometry.hyperbolic import Hyperbolic
 from geomstats.geometry.riemannian_metric import RiemannianMetric
 
 TOLERANCE = 1e-6
 EPSILON = 1e-6
+BLOCK_COORDINATES = 2 ** 17
+
+
+def _normalize_and_norm(vector):
+    """Compute the direction and the norm of vectors in a single pass.
+
+    The inverse norm is computed once per sample and shared by all the
+    coordinates, which saves a division per coordinate. Vectors whose norm
+    is below EPSILON are returned unnormalized, so that no division by
+    zero occurs: callers scale them by the limit at zero of their
+    coefficient per unit length.
+
+    Parameters
+    ----------
+    vector : array-like, shape=[n_samples, dim]
+        Vectors to normalize.
+
+    Returns
+    -------
+    direction : array-like, shape=[n_samples, dim]
+        Unit vectors with the direction of vector, or vector itself if
+        its norm is below EPSILON.
+    norm : array-like, shape=[n_samples, 1]
+        Euclidean norms of vector.
+    """
+    sq_norm = gs.einsum('...i,...i->...', vector, vector)
+    norm = gs.sqrt(gs.expand_dims(sq_norm, axis=-1))
+    inv_norm = 1 / gs.where(norm < EPSILON, gs.ones_like(norm), norm)
+    return vector * inv_norm, norm
+
+
+def _split_samples(n_samples, dim):
+    """Split the sample axis into blocks that fit in the cache.
+
+    Each block holds at most BLOCK_COORDINATES coordinates, so that all
+    the passes of a computation over a block reuse cached data. This is
+    1 MiB of float64 data, and half of it in float32.
+
+    Parameters
+    ----------
+    n_samples : int
+        Number of samples.
+    dim : int
+        Number of coordinates of each sample.
+
+    Returns
+    -------
+    blocks : list of slice
+        Consecutive slices covering range(n_samples).
+    """
+    block_size = max(1, BLOCK_COORDINATES // dim)
+    return [slice(start, start + block_size)
+            for start in range(0, n_samples, block_size)]
+
+
+def _get_block(array, block):
+    """Select a block of samples, leaving broadcast arrays untouched.
+
+    Parameters
+    ----------
+    array : array-like, shape=[n_samples, ...] or shape=[1, ...], or None
+        Array to slice along its first axis.
+    block : slice
+        Block of samples to select.
+
+    Returns
+    -------
+    array_block : array-like
+        The block of array, or array itself if it has a single sample
+        or is None.
+    """
+    if array is None or array.shape[0] == 1:
+        return array
+    return array[block]
 
 
 class PoincareBall(Hyperbolic):
@@ -24,19 +99,25 @@ class PoincareBall(Hyperbolic):
     scale : int, optional
         Scale of the hyperbolic space, defined as the set of points
         in Minkowski space whose squared norm is equal to -scale.
+    check_belongs : bool, optional
+        Passed to the metric, see PoincareBallMetric.
+    dtype : data-type, optional
+        Passed to the metric, see PoincareBallMetric.
     """
 
     default_coords_type = 'ball'
     default_point_type = 'vector'
 
-    def __init__(self, dim, scale=1):
+    def __init__(self, dim, scale=1, check_belongs=True, dtype=None):
         super(PoincareBall, self).__init__(
             dim=dim,
             scale=scale)
         self.coords_type = PoincareBall.default_coords_type
         self.point_type = PoincareBall.default_point_type
         self.metric =\
-            PoincareBallMetric(self.dim, self.scale)
+            PoincareBallMetric(
+                self.dim, self.scale,
+                check_belongs=check_belongs, dtype=dtype)
 
     def belongs(self, point, tolerance=TOLERANCE):
         """Test if a point belongs to the hyperbolic space.
@@ -54,11 +135,11 @@ class PoincareBall(Hyperbolic):
 
         Returns
         -------
-        belongs : array-like, shape=[n_samples, 1]
+        belongs : array-like, shape=[n_samples,]
             Array of booleans indicating whether the corresponding points
             belong to the hyperbolic space.
         """
-        return gs.sum(point**2, axis=-1) < (1 - tolerance)
+        return gs.einsum('...i,...i->...', point, point) < (1 - tolerance)
 
 
 class PoincareBallMetric(RiemannianMetric):
@@ -71,18 +152,62 @@ class PoincareBallMetric(RiemannianMetric):
     scale : int, optional
         Scale of the hyperbolic space, defined as the set of points
         in Minkowski space whose squared norm is equal to -scale.
+    check_belongs : bool, optional
+        Whether exp, mobius_add and retraction check that their inputs,
+        and the outputs of exp, belong to the Poincare ball. Disable it
+        in tight loops where the inputs are known to be valid.
+    dtype : data-type, optional
+        Data type to which the inputs of exp, log, mobius_add, dist,
+        pairwise_dist and retraction are cast, e.g. gs.float32 to halve
+        the memory traffic of embedding workloads. By default, the
+        inputs keep their own data type.
     """
 
     default_point_type = 'vector'
     default_coords_type = 'ball'
 
-    def __init__(self, dim, scale=1):
+    def __init__(self, dim, scale=1, check_belongs=True, dtype=None):
         super(PoincareBallMetric, self).__init__(
             dim=dim,
             signature=(dim, 0, 0))
         self.coords_type = PoincareBall.default_coords_type
         self.point_type = PoincareBall.default_point_type
         self.scale = scale
+        self.check_belongs = check_belongs
+        self.dtype = dtype
+
+    def _to_ndarray(self, point):
+        """Convert a point to a 2D array of the data type of the metric.
+
+        Parameters
+        ----------
+        point : array-like, shape=[n_samples, dim] or shape=[dim]
+            Point to convert.
+
+        Returns
+        -------
+        point : array-like, shape=[n_samples, dim]
+            Converted point.
+        """
+        point = gs.to_ndarray(point, to_ndim=2)
+        dtype = self.dtype
+        if dtype is not None and point.dtype != dtype:
+            point = gs.cast(point, dtype)
+        return point
+
+    @staticmethod
+    def _check_belongs(*points):
+        """Raise an error if a point does not belong to the Poincare ball.
+
+        Parameters
+        ----------
+        points : array-like, shape=[n_samples, dim]
+            Points to be tested.
+        """
+        for point in points:
+            sq_norm = gs.einsum('...i,...i->...', point, point)
+            if not gs.all(sq_norm < (1 - TOLERANCE)):
+                raise NameError("Points do not belong to the Poincare ball")
 
     def exp(self, tangent_vec, base_point):
         """Compute the Riemannian exponential of a tangent vector.
@@ -100,40 +225,47 @@ class PoincareBallMetric(RiemannianMetric):
             Point in hyperbolic space equal to the Riemannian exponential
             of tangent_vec at the base point.
         """
-        tangent_vec = gs.to_ndarray(tangent_vec, to_ndim=2)
-        base_point = gs.to_ndarray(base_point, to_ndim=2)
+        tangent_vec = self._to_ndarray(tangent_vec)
+        base_point = self._to_ndarray(base_point)
 
-        norm_base_point =\
-            gs.expand_dims(gs.linalg.norm(base_point, axis=-1),
-                           axis=-1)
+        if self.check_belongs:
+            self._check_belongs(base_point)
 
-        den = 1 - norm_base_point**2
+        sq_norm_base_point =\
+            gs.einsum('...i,...i->...', base_point, base_point)
+        sq_norm_base_point = gs.expand_dims(sq_norm_base_point, axis=-1)
 
-        norm_tan =\
-            gs.expand_dims(gs.linalg.norm(tangent_vec, axis=-1),
-                           axis=-1)
+        den = 1 - sq_norm_base_point
 
-        lambda_base_point = 1 / den
+        direction, norm_tan = _normalize_and_norm(tangent_vec)
+        small_tan = norm_tan < EPSILON
 
-        zero_tan =\
-            gs.isclose(gs.sum(tangent_vec * tangent_vec, axis=-1), 0.)
-
-        if gs.any(zero_tan):
-            if norm_tan[zero_tan].shape[0] != 0:
-                norm_tan[zero_tan] = EPSILON
+        lambda_base_point = 1 / den
 
-        direction = gs.einsum('...i,...k->...i', tangent_vec, 1 / norm_tan)
+        # Small tangent vectors are left unnormalized in direction, and
+        # tanh(lambda * ||v||) / ||v|| tends to lambda at zero.
+        factor = gs.where(
+            small_tan, lambda_base_point * gs.ones_like(norm_tan),
+            gs.tanh(lambda_base_point * norm_tan))
+        norm_direction = gs.where(
+            small_tan, norm_tan, gs.ones_like(norm_tan))
 
-        factor = gs.tanh(lambda_base_point * norm_tan)
+        # Mobius addition of base_point and factor * direction, using the
+        # known norm of direction so that only scalar products are needed.
+        prod_base_direction =\
+            gs.einsum('...i,...i->...', base_point, direction)
+        prod_base_direction = gs.expand_dims(prod_base_direction, axis=-1)
 
-        exp = self.mobius_add(base_point, direction * factor)
+        sq_norm_added = (factor * norm_direction) ** 2
+        common = 1 + 2 * factor * prod_base_direction
 
-        zero_tan =\
-            gs.isclose(gs.sum(tangent_vec * tangent_vec, axis=-1), 0.)
+        exp_denominator = common + sq_norm_base_point * sq_norm_added
+        coef_base_point = (common + sq_norm_added) / exp_denominator
+        coef_direction = den * factor / exp_denominator
+        exp = coef_base_point * base_point + coef_direction * direction
 
-        if gs.any(zero_tan):
-            if exp[zero_tan].shape[0] != 0:
-                exp[zero_tan] = base_point[zero_tan]
+        if self.check_belongs:
+            self._check_belongs(exp)
 
         return exp
 
@@ -157,24 +289,22 @@ class PoincareBallMetric(RiemannianMetric):
             Tangent vector at the base point equal to the Riemannian logarithm
             of point at the base point.
         """
-        base_point = gs.to_ndarray(base_point, to_ndim=2)
-        point = gs.to_ndarray(point, to_ndim=2)
+        base_point = self._to_ndarray(base_point)
+        point = self._to_ndarray(point)
 
         add_base_point = self.mobius_add(-base_point, point)
-        norm_add =\
-            gs.expand_dims(gs.linalg.norm(
-                           add_base_point, axis=-1), axis=-1)
-
-        norm_base_point =\
-            gs.expand_dims(gs.linalg.norm(
-                           base_point, axis=-1), axis=-1)
+        direction, norm_add = _normalize_and_norm(add_base_point)
 
-        log = (1 - norm_base_point**2) * gs.arctanh(norm_add)
-        log = gs.einsum('...i,...j->...j', log, (add_base_point / norm_add))
+        sq_norm_base_point =\
+            gs.einsum('...i,...i->...', base_point, base_point)
+        sq_norm_base_point = gs.expand_dims(sq_norm_base_point, axis=-1)
 
-        mask_0 = gs.isclose(gs.squeeze(norm_add, axis=-1), 0.)
-        if gs.any(mask_0):
-            log[mask_0] = 0
+        # Small vectors are left unnormalized in direction, and
+        # arctanh(||u||) / ||u|| tends to 1 at zero.
+        coef = gs.where(
+            norm_add < EPSILON, gs.ones_like(norm_add),
+            gs.arctanh(gs.clip(norm_add, 0., 1 - EPSILON)))
+        log = (1 - sq_norm_base_point) * coef * direction
 
         return log
 
@@ -201,38 +331,62 @@ class PoincareBallMetric(RiemannianMetric):
         mobius_add : array-like, shape=[n_samples, 1]
             Result of the Mobius addition.
         """
-        point_a = gs.to_ndarray(point_a, to_ndim=2)
-        point_b = gs.to_ndarray(point_b, to_ndim=2)
+        point_a = self._to_ndarray(point_a)
+        point_b = self._to_ndarray(point_b)
 
-        ball_manifold = PoincareBall(self.dim, scale=self.scale)
-        point_a_belong = ball_manifold.belongs(point_a)
-        point_b_belong = ball_manifold.belongs(point_b)
+        blocks = _split_samples(
+            max(point_a.shape[0], point_b.shape[0]), point_a.shape[-1])
+        if len(blocks) > 1:
+            return gs.concatenate([
+                self.mobius_add(
+                    _get_block(point_a, block), _get_block(point_b, block))
+                for block in blocks], axis=0)
 
-        if(not gs.all(point_a_belong) or not gs.all(point_b_belong)):
-            raise NameError("Points do not belong to the Poincare ball")
+        if self.check_belongs:
+            self._check_belongs(point_a, point_b)
 
-        norm_point_a = gs.sum(point_a ** 2, axis=-1,
-                              keepdims=True)
+        norm_point_a = gs.einsum('...i,...i->...', point_a, point_a)
+        norm_point_a = gs.expand_dims(norm_point_a, axis=-1)
 
-        norm_point_b = gs.sum(point_b ** 2, axis=-1,
-                              keepdims=True)
+        norm_point_b = gs.einsum('...i,...i->...', point_b, point_b)
+        norm_point_b = gs.expand_dims(norm_point_b, axis=-1)
 
         sum_prod_a_b = gs.einsum('...i,...i->...', point_a, point_b)
         sum_prod_a_b = gs.expand_dims(sum_prod_a_b, axis=-1)
 
-        add_num_1 = 1 + 2 * sum_prod_a_b + norm_point_b
-        add_num_1 = gs.einsum('...i,...k->...k', add_num_1, point_a)
-        add_num_2 = gs.einsum('...i,...k->...k', (1 - norm_point_a), point_b)
-        add_nominator = add_num_1 + add_num_2
+        common = 1 + 2 * sum_prod_a_b
 
-        add_denominator = (1 + 2 * sum_prod_a_b + norm_point_a * norm_point_b)
+        add_denominator = common + norm_point_a * norm_point_b
+        coef_a = (common + norm_point_b) / add_denominator
+        coef_b = (1 - norm_point_a) / add_denominator
 
-        mobius_add =\
-            gs.einsum('...i,...k->...i', add_nominator, 1 / add_denominator)
+        mobius_add = coef_a * point_a + coef_b * point_b
 
         return mobius_add
 
-    def dist(self, point_a, point_b):
+    def precompute_norms(self, points):
+        """Compute the norm terms of points used by dist.
+
+        The result can be passed to dist as point_a_norm_cache or
+        point_b_norm_cache to avoid recomputing it when the same points
+        are queried repeatedly.
+
+        Parameters
+        ----------
+        points : array-like, shape=[n_samples, dim]
+            Points in hyperbolic space.
+
+        Returns
+        -------
+        norm_cache : array-like, shape=[n_samples,]
+            One minus the squared norm of each point, clipped away from 0.
+        """
+        points = self._to_ndarray(points)
+        sq_norm = gs.einsum('...i,...i->...', points, points)
+        return 1 - gs.clip(sq_norm, 0., 1 - EPSILON)
+
+    def dist(self, point_a, point_b,
+             point_a_norm_cache=None, point_b_norm_cache=None):
         """Compute the geodesic distance between two points.
 
         Parameters
@@ -241,27 +395,91 @@ class PoincareBallMetric(RiemannianMetric):
             First point in hyperbolic space.
         point_b : array-like, shape=[n_samples, dim]
             Second point in hyperbolic space.
+        point_a_norm_cache : array-like, shape=[n_samples,], optional
+            Output of precompute_norms for point_a.
+        point_b_norm_cache : array-like, shape=[n_samples,], optional
+            Output of precompute_norms for point_b.
 
         Returns
         -------
         dist : array-like, shape=[n_samples, 1]
             Geodesic distance between the two points.
         """
-        point_a = gs.to_ndarray(point_a, to_ndim=2)
-        point_b = gs.to_ndarray(point_b, to_ndim=2)
+        point_a = self._to_ndarray(point_a)
+        point_b = self._to_ndarray(point_b)
+
+        blocks = _split_samples(
+            max(point_a.shape[0], point_b.shape[0]), point_a.shape[-1])
+        if len(blocks) > 1:
+            return gs.concatenate([
+                self.dist(
+                    _get_block(point_a, block), _get_block(point_b, block),
+                    _get_block(point_a_norm_cache, block),
+                    _get_block(point_b_norm_cache, block))
+                for block in blocks], axis=0)
+
+        if point_a_norm_cache is None:
+            point_a_norm_cache = self.precompute_norms(point_a)
+        if point_b_norm_cache is None:
+            point_b_norm_cache = self.precompute_norms(point_b)
+
+        diff = point_a - point_b
+        diff_norm = gs.einsum('...i,...i->...', diff, diff)
+        ratio = diff_norm / (point_a_norm_cache * point_b_norm_cache)
+
+        # arccosh(1 + 2 * ratio), well conditioned for nearby points
+        dist = 2 * gs.arcsinh(gs.sqrt(ratio))
+        dist = (self.scale * dist)[:, None]
+        return dist
 
-        point_a_norm = gs.clip(gs.sum(point_a ** 2, -1), 0., 1 - EPSILON)
-        point_b_norm = gs.clip(gs.sum(point_b ** 2, -1), 0., 1 - EPSILON)
+    def pairwise_dist(self, point_a, point_b):
+        """Compute the geodesic distances between two sets of points.
 
-        diff_norm = gs.sum((point_a - point_b) ** 2, -1)
-        norm_function = 1 + 2 * \
-            diff_norm / ((1 - point_a_norm) * (1 - point_b_norm))
+        The squared Euclidean distances are expanded as
+        ||a||^2 + ||b||^2 - 2 <a, b>, so that all the cross products are
+        computed by a single matrix product.
 
-        dist = gs.log(norm_function + gs.sqrt(norm_function ** 2 - 1))
-        dist = gs.to_ndarray(dist, to_ndim=1)
-        dist = gs.to_ndarray(dist, to_ndim=2, axis=1)
-        dist *= self.scale
-        return dist
+        The expansion cancels for nearby points, so the result has an
+        absolute error of order scale * sqrt(eps) / (1 - ||x||^2), where
+        eps is the machine epsilon of the data type: about 1e-8 in
+        float64. Distances below that are unreliable; use dist when
+        they matter. If point_a and point_b are the same object, the
+        diagonal is set to exactly zero.
+
+        Parameters
+        ----------
+        point_a : array-like, shape=[n_samples_a, dim]
+            First set of points in hyperbolic space.
+        point_b : array-like, shape=[n_samples_b, dim]
+            Second set of points in hyperbolic space.
+
+        Returns
+        -------
+        dist : array-like, shape=[n_samples_a, n_samples_b]
+            Geodesic distance between each point of point_a and each
+            point of point_b.
+        """
+        same_points = point_a is point_b
+        point_a = self._to_ndarray(point_a)
+        point_b = self._to_ndarray(point_b)
+
+        sq_norm_a = gs.einsum('...i,...i->...', point_a, point_a)
+        sq_norm_b = gs.einsum('...i,...i->...', point_b, point_b)
+
+        diff_norm = sq_norm_a[:, None] + sq_norm_b[None, :]\
+            - 2 * gs.matmul(point_a, gs.transpose(point_b))
+        diff_norm = gs.maximum(diff_norm, 0.)
+        if same_points:
+            diff_norm = gs.where(
+                gs.eye(point_a.shape[0]) == 1,
+                gs.zeros_like(diff_norm), diff_norm)
+
+        point_a_norm_cache = 1 - gs.clip(sq_norm_a, 0., 1 - EPSILON)
+        point_b_norm_cache = 1 - gs.clip(sq_norm_b, 0., 1 - EPSILON)
+        ratio = diff_norm / (
+            point_a_norm_cache[:, None] * point_b_norm_cache[None, :])
+
+        return self.scale * 2 * gs.arcsinh(gs.sqrt(ratio))
 
     def retraction(self, tangent_vec, base_point):
         """Poincaré ball model retraction.
@@ -283,20 +501,19 @@ class PoincareBallMetric(RiemannianMetric):
         point : array-like, shape=[n_samples, dim]
             Retraction point.
         """
-        ball_manifold = PoincareBall(self.dim, scale=self.scale)
-        base_point_belong = ball_manifold.belongs(base_point)
+        tangent_vec = self._to_ndarray(tangent_vec)
+        base_point = self._to_ndarray(base_point)
 
-        if not gs.all(base_point_belong):
-            raise NameError("Points do not belong to the Poincare ball")
+        if self.check_belongs:
+            self._check_belongs(base_point)
 
-        tangent_vec = gs.to_ndarray(tangent_vec, to_ndim=2)
-        base_point = gs.to_ndarray(base_point, to_ndim=2)
+        sq_norm_base_point =\
+            gs.einsum('...i,...i->...', base_point, base_point)
+        sq_norm_base_point = gs.expand_dims(sq_norm_base_point, axis=-1)
 
-        retraction_factor =\
-            ((1 - gs.sum(base_point**2, axis=-1, keepdims=True))**2) / 4
+        retraction_factor = ((1 - sq_norm_base_point) ** 2) / 4
 
-        return base_point\
-            - gs.einsum('...i,...j->...j', retraction_factor, tangent_vec)
+        return base_point - retraction_factor * tangent_vec
 
     def inner_product_matrix(self, base_point=None):
         """Compute the inner product matrix.
@@ -317,3 +534,37 @@ class PoincareBallMetric(RiemannianMetric):
         identity = gs.eye(self.dim, self.dim)
 
         return gs.einsum('i,jk->ijk', lambda_base, identity)
+
+    @geomstats.vectorization.decorator(['else', 'vector', 'vector', 'vector'])
+    def inner_product(self, tangent_vec_a, tangent_vec_b, base_point=None):
+        """Inner product between two tangent vectors at a base point.
+
+        The metric is conformal, so the inner product is the Euclidean one
+        scaled by the squared conformal factor and the inner product matrix
+        does not need to be built.
+
+        Parameters
+        ----------
+        tangent_vec_a: array-like, shape=[n_samples, dim]
+                                   or shape=[1, dim]
+        tangent_vec_b: array-like, shape=[n_samples, dim]
+                                   or shape=[1, dim]
+        base_point: array-like, shape=[n_samples, dim]
+                                or shape=[1, dim]
+
+        Returns
+        -------
+        inner_product : array-like, shape=[n_samples,]
+        """
+        if base_point is None:
+            base_point = gs.zeros((1, self.dim))
+
+        sq_norm_base_point =\
+            gs.einsum('...i,...i->...', base_point, base_point)
+        lambda_base = (2 / (1 - sq_norm_base_point)) ** 2
+
+        inner_prod =\
+            gs.einsum('...i,...i->...', tangent_vec_a, tangent_vec_b)
+        inner_prod = (lambda_base * inner_prod)[:, None]
+
+        return inner_prod
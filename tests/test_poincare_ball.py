@@ -9,10 +9,14 @@ coordinates systems.
 
 """
 
+import autograd
+
 import geomstats.backend as gs
 import geomstats.tests
 from geomstats.geometry.hyperboloid import Hyperboloid
 from geomstats.geometry.poincare_ball import PoincareBall
+from geomstats.geometry.riemannian_metric import RiemannianMetric
+from geomstats.learning.frechet_mean import variance
 
 
 class TestPoincareBallMethods(geomstats.tests.TestCase):
@@ -195,3 +199,236 @@ class TestPoincareBallMethods(geomstats.tests.TestCase):
         ball_metric = self.manifold.metric
         tangent_vec = ball_metric.log(y, x)
         ball_metric.retraction(tangent_vec, x)
+
+    def test_mobius_add_check_belongs(self):
+        point_a = gs.array([[1.2, 0.5]])
+        point_b = gs.array([[0.3, 0.5]])
+
+        self.assertRaises(
+            NameError, self.metric.mobius_add, point_a, point_b)
+
+        metric = PoincareBall(2, check_belongs=False).metric
+        result = metric.mobius_add(point_a, point_b)
+        self.assertAllClose(gs.shape(result), (1, 2))
+
+    def test_exp_zero_tangent_vec(self):
+        base_point = gs.array([[0.3, 0.3], [0.2, -0.4]])
+        tangent_vec = gs.array([[0., 0.], [0.1, 0.2]])
+
+        result = self.metric.exp(tangent_vec, base_point)
+        expected = gs.array(
+            [base_point[0],
+             self.metric.exp(tangent_vec[1], base_point[1])[0]])
+        self.assertAllClose(result, expected)
+
+    def test_inner_product(self):
+        tangent_vec_a = gs.array([[0.3, -0.2], [0.1, 0.4]])
+        tangent_vec_b = gs.array([[0.5, 0.1], [-0.2, 0.3]])
+        base_point = gs.array([[0.3, 0.3], [0.2, -0.4]])
+
+        result = self.metric.inner_product(
+            tangent_vec_a, tangent_vec_b, base_point)
+        expected = RiemannianMetric.inner_product(
+            self.metric, tangent_vec_a, tangent_vec_b, base_point)
+        self.assertAllClose(gs.shape(result), gs.shape(expected))
+        self.assertAllClose(result, expected)
+
+        result = self.metric.inner_product(
+            tangent_vec_a[0], tangent_vec_b[0], base_point[0])
+        expected = RiemannianMetric.inner_product(
+            self.metric, tangent_vec_a[0], tangent_vec_b[0], base_point[0])
+        self.assertAllClose(gs.shape(result), gs.shape(expected))
+        self.assertAllClose(result, expected)
+
+    def test_squared_dist_and_variance_shape(self):
+        points = gs.array([[0.1, 0.2], [0.3, -0.1], [-0.2, 0.4]])
+        base_point = gs.array([0.05, 0.1])
+
+        result = self.metric.squared_dist(base_point, points)
+        self.assertAllClose(gs.shape(result), (3,))
+
+        result = self.metric.squared_dist(base_point, points[0])
+        self.assertAllClose(gs.shape(result), (1,))
+
+        result = variance(points, base_point, self.metric)
+        expected = gs.sum(self.metric.dist(base_point, points) ** 2) / 3
+        self.assertAllClose(result, expected)
+
+    def test_dist_norm_cache(self):
+        point_a = gs.array([[0.2, 0.5]])
+        point_b = gs.array([[0.3, -0.5], [0.2, 0.2]])
+
+        point_b_norm_cache = self.metric.precompute_norms(point_b)
+        result = self.metric.dist(
+            point_a, point_b, point_b_norm_cache=point_b_norm_cache)
+        expected = self.metric.dist(point_a, point_b)
+        self.assertAllClose(result, expected)
+
+    def test_pairwise_dist(self):
+        point_a = gs.array([[0.2, 0.5], [-0.3, 0.1], [0.6, -0.2]])
+        point_b = gs.array([[0.3, -0.5], [0.2, 0.2]])
+
+        result = self.metric.pairwise_dist(point_a, point_b)
+        expected = gs.concatenate(
+            [gs.transpose(self.metric.dist(point, point_b))
+             for point in point_a], axis=0)
+        self.assertAllClose(result, expected)
+
+    @geomstats.tests.np_only
+
+    def test_pairwise_dist_same_points(self):
+        points = 0.05 * gs.random.rand(20, 16)
+        metric = PoincareBall(16).metric
+
+        result = metric.pairwise_dist(points, points)
+        self.assertAllClose(
+            gs.diagonal(result), gs.zeros(20), rtol=0., atol=0.)
+
+    @geomstats.tests.np_only
+    def test_pairwise_dist_close_points(self):
+        point_a = gs.array([[0.3, 0.5], [-0.2, 0.1], [0.6, -0.3]])
+        point_b = point_a + 1e-9
+
+        result = gs.diagonal(self.metric.pairwise_dist(point_a, point_b))
+        expected = self.metric.dist(point_a, point_b)[:, 0]
+        self.assertAllClose(result, expected, rtol=0., atol=1e-7)
+    def test_dist_float32(self):
+        metric = PoincareBall(2, dtype=gs.float32).metric
+        point_a = gs.array([[0.5, 0.5]])
+        point_b = gs.array([[0.5, -0.5]])
+
+        result = metric.dist(point_a, point_b)
+        expected = gs.array([[2.887270927429199]])
+
+        self.assertEqual(result.dtype, gs.float32)
+        self.assertAllClose(result, expected, atol=1e-5)
+
+        point_b_norm_cache = metric.precompute_norms(point_b)
+        result = metric.dist(
+            point_a, point_b, point_b_norm_cache=point_b_norm_cache)
+        self.assertEqual(point_b_norm_cache.dtype, gs.float32)
+        self.assertEqual(result.dtype, gs.float32)
+        self.assertAllClose(result, expected, atol=1e-5)
+
+    def test_dist_and_mobius_add_blocks(self):
+        dim = 1024
+        metric = PoincareBall(dim).metric
+        point_a = 0.02 * gs.random.rand(300, dim)
+        point_b = 0.02 * gs.random.rand(300, dim)
+
+        result = metric.dist(point_a, point_b)
+        expected = gs.concatenate(
+            [metric.dist(point_a[i:i + 100], point_b[i:i + 100])
+             for i in range(0, 300, 100)], axis=0)
+        self.assertAllClose(result, expected)
+
+        result = metric.mobius_add(point_a, point_b)
+        expected = gs.concatenate(
+            [metric.mobius_add(point_a[i:i + 100], point_b[i:i + 100])
+             for i in range(0, 300, 100)], axis=0)
+        self.assertAllClose(result, expected)
+
+    def test_dist_close_points_float32(self):
+        point_a = gs.array([[0.25, 0.5]])
+        point_b = gs.array([[0.25, 0.5 + 2. ** -14]])
+
+        result = self.metric.dist(point_a, point_b)
+        expected = gs.array([[0.0001775647005604143]])
+        self.assertAllClose(result, expected, rtol=1e-5, atol=0.)
+
+    @geomstats.tests.np_only
+    def test_dist_close_points(self):
+        point_a = gs.array([[0.3, 0.5]])
+        point_b = point_a + 1e-9
+
+        result = self.metric.dist(point_a, point_b)
+        expected = 2 / (1 - gs.sum(point_a ** 2)) * gs.sqrt(2.) * 1e-9
+        self.assertAllClose(result, gs.array([[expected]]), atol=0.)
+
+    def test_log_same_point(self):
+        point = gs.array([[0.3, 0.5], [0.2, -0.4]])
+        base_point = gs.array([[0.3, 0.5], [0.3, 0.3]])
+
+        result = self.metric.log(point, base_point)
+        expected = gs.array(
+            [[0., 0.], self.metric.log(point[1], base_point[1])[0]])
+        self.assertAllClose(result, expected)
+
+    def test_exp_and_log_at_origin(self):
+        origin = gs.array([[0., 0.]])
+        near_origin = gs.array([[1e-12, 0.]])
+        tangent_vec = gs.array([[0.3, -0.2], [1.5, 0.4], [0., 0.]])
+        point = gs.array([[0.3, -0.2], [0.6, 0.4]])
+
+        result = self.metric.exp(tangent_vec, origin)
+        expected = self.metric.exp(tangent_vec, near_origin)
+        self.assertAllClose(result, expected)
+
+        result = self.metric.log(point, origin)
+        expected = self.metric.log(point, near_origin)
+        self.assertAllClose(result, expected)
+
+    def test_ball_retraction_value(self):
+        tangent_vec = gs.array([[0.1, -0.2], [0.3, 0.1]])
+        base_point = gs.array([[0.5, 0.6], [0.2, -0.1]])
+
+        result = self.metric.retraction(tangent_vec, base_point)
+        expected = gs.array(
+            [[0.5 - 0.1521 / 4 * 0.1, 0.6 + 0.1521 / 4 * 0.2],
+             [0.2 - 0.9025 / 4 * 0.3, -0.1 - 0.9025 / 4 * 0.1]])
+        self.assertAllClose(result, expected)
+
+    def test_exp_large_tangent_vec(self):
+        tangent_vec = gs.array([[20., 0.]])
+        base_point = gs.array([[0.5, 0.]])
+
+        self.assertRaises(
+            NameError, self.metric.exp, tangent_vec, base_point)
+        self.assertRaises(
+            NameError, self.metric.exp, tangent_vec, gs.zeros((1, 2)))
+
+        result = self.metric.exp(tangent_vec / 20, base_point)
+        self.assertTrue(gs.all(self.manifold.belongs(result)))
+
+    @geomstats.tests.np_only
+    def test_exp_and_log_small_vectors(self):
+        base_point = gs.array([[0.3, 0.5], [0.3, 0.5]])
+        small_vec = gs.array([[1e-7, -2e-7], [3e-9, 1e-9]])
+
+        result = self.metric.log(base_point + small_vec, base_point)
+        self.assertAllClose(result, small_vec, rtol=1e-6, atol=0.)
+
+        result = self.metric.exp(small_vec, base_point)
+        self.assertAllClose(
+            result - base_point, small_vec, rtol=1e-6, atol=0.)
+
+    @geomstats.tests.np_only
+    def test_exp_and_log_small_vectors_at_origin(self):
+        origin = gs.array([[0., 0.]])
+        small_vec = gs.array([[1e-7, 0.], [2e-9, -3e-9]])
+
+        result = self.metric.log(small_vec, origin)
+        self.assertAllClose(result, small_vec, rtol=1e-6, atol=0.)
+
+        result = self.metric.exp(small_vec, origin)
+        self.assertAllClose(result, small_vec, rtol=1e-6, atol=0.)
+
+    @geomstats.tests.np_only
+    def test_exp_and_log_gradient_at_origin(self):
+        metric = PoincareBall(3).metric
+        origin = gs.zeros((1, 3))
+        near_origin = gs.array([[1e-12, 0., 0.]])
+        tangent_vec = gs.array([[0.3, -0.2, 0.4]])
+        point = gs.array([[0.2, 0.1, -0.3]])
+
+        def exp_sum(base_point):
+            return gs.sum(metric.exp(tangent_vec, base_point))
+
+        def log_sum(base_point):
+            return gs.sum(metric.log(point, base_point))
+
+        for function in [exp_sum, log_sum]:
+            result = autograd.grad(function)(origin)
+            expected = autograd.grad(function)(near_origin)
+            self.assertAllClose(result, expected)
+            self.assertTrue(gs.all(gs.abs(result) > 0.5))